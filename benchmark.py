@@ -3,10 +3,17 @@
 Benchmark script comparing xml_iterator.xml_to_dict vs xmltodict
 """
 
+import argparse
+import atexit
+import gc
+import math
+import mmap
 import tempfile
 import os
 import time
 import statistics
+import sys
+from pathlib import Path
 from typing import List, Tuple
 
 try:
@@ -17,94 +24,162 @@ except ImportError:
     print("ERROR: xmltodict required for benchmarking - install with: pip install xmltodict")
     exit(1)
 
-from xml_iterator.core import xml_to_dict
+from xml_iterator.core import xml_to_dict, xml_to_dict_from_bytes
+from xml_iterator.xml_iterator import get_edge_counts
 
 
-def create_test_xml(num_items: int) -> str:
-    """Create XML file with specified number of items"""
-    fd, path = tempfile.mkstemp(suffix='.xml')
-    try:
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<catalog>\n')
-            for i in range(num_items):
-                f.write(f'''  <book id="{i}">
-    <title>Book Title {i}</title>
-    <author>Author {i % 100}</author>
-    <year>{2000 + (i % 24)}</year>
-    <price>${(i % 50) + 10}.99</price>
-    <description>Description for book {i} with some longer text content to make parsing more realistic.</description>
+BOOK_TEMPLATE = '''  <book id="{0}">
+    <title>Book Title {0}</title>
+    <author>Author {1}</author>
+    <year>{2}</year>
+    <price>${3}.99</price>
+    <description>Description for book {0} with some longer text content to make parsing more realistic.</description>
     <categories>
       <category>Fiction</category>
       <category>Adventure</category>
     </categories>
   </book>
-''')
-            f.write('</catalog>\n')
+'''
+
+
+def create_test_xml(num_items: int) -> str:
+    """Create XML file with specified number of items"""
+    body = ''.join(BOOK_TEMPLATE.format(i, i % 100, 2000 + (i % 24), (i % 50) + 10) for i in range(num_items))
+    content = '<?xml version="1.0" encoding="UTF-8"?>\n<catalog>\n' + body + '</catalog>\n'
+    fd, path = tempfile.mkstemp(suffix='.xml')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content.encode('utf-8'))
         return path
     except:
         os.close(fd)
         raise
 
 
+_test_xml_paths = {}
+
+
+def cached_test_xml(num_items: int) -> str:
+    """create_test_xml, but each size is written once per process and removed at exit"""
+    if num_items not in _test_xml_paths:
+        _test_xml_paths[num_items] = create_test_xml(num_items)
+    return _test_xml_paths[num_items]
+
+
+def prefetch_test_xml(sizes: List[int]) -> None:
+    """Generate every size up front so no file is written while timing"""
+    for size in sizes:
+        cached_test_xml(size)
+
+
+@atexit.register
+def _remove_generated_files():
+    for path in _test_xml_paths.values():
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def xmltodict_parse(filepath):
+    """Parse file with xmltodict straight from a read-only mmap (no full read() copy)"""
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return xmltodict.parse(mm)
+
+
 def time_function(func, *args, num_runs: int = 5) -> Tuple[float, float]:
-    """Time function execution with multiple runs"""
+    """Time function execution with multiple runs
+
+    One unmeasured warmup call absorbs imports, lazy FFI loading and cold caches.
+    Returns (median, sample stdev about the mean) in seconds; GC is collected then disabled per run.
+    """
+    func(*args)
     times = []
+    gc_enabled = gc.isenabled()
     for _ in range(num_runs):
-        start = time.perf_counter()
-        result = func(*args)
-        end = time.perf_counter()
-        times.append(end - start)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            func(*args)
+            end = time.perf_counter_ns()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        times.append((end - start) / 1e9)
     
-    return statistics.mean(times), statistics.stdev(times) if len(times) > 1 else 0.0
+    # Plain float sample stdev; statistics.stdev goes through exact Fraction arithmetic
+    n = len(times)
+    mean = sum(times) / n
+    std = math.sqrt(sum((t - mean) * (t - mean) for t in times) / (n - 1)) if n > 1 else 0.0
+    return statistics.median(times), std
+
+
+DEFAULT_SIZES = [100, 500, 1000, 2000, 5000]
+QUICK_SIZES = [500, 5000]
+STREAMING_SIZE = 10000
+README_SIZES = [500, 2000, 5000]
+
+
+def isolate_benchmark_process():
+    """Reduce run-to-run noise: pin to one CPU, raise priority, avoid thread switches
+
+    Each step is best-effort (Linux only / needs privileges) and silently skipped
+    otherwise.
+    """
+    try:
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.nice(-10)
+    except (AttributeError, OSError):
+        pass
+    sys.setswitchinterval(1.0)
 
 
-def benchmark_xmltodict_compatibility():
+def benchmark_xmltodict_compatibility(test_sizes: List[int] = DEFAULT_SIZES, num_runs: int = 5):
     """Benchmark xml_to_dict vs xmltodict on various file sizes"""
     print("XML Parser Benchmark: xml_iterator vs xmltodict")
     print("=" * 60)
     print()
     
-    test_sizes = [100, 500, 1000, 2000, 5000]
     results = []
+    prefetch_test_xml(test_sizes)
     
     for size in test_sizes:
         print(f"Testing with {size} XML elements...")
-        xml_file = create_test_xml(size)
+        xml_file = cached_test_xml(size)
         file_size_mb = os.path.getsize(xml_file) / 1024 / 1024
         
-        try:
-            # Benchmark our implementation
-            our_mean, our_std = time_function(xml_to_dict, xml_file, num_runs=5)
-            
-            # Benchmark xmltodict
-            def xmltodict_parse(filepath):
-                with open(filepath, 'r') as f:
-                    return xmltodict.parse(f.read())
-            
-            xml_mean, xml_std = time_function(xmltodict_parse, xml_file, num_runs=5)
-            
-            # Calculate speedup
-            speedup = xml_mean / our_mean if our_mean > 0 else float('inf')
-            
-            results.append({
-                'size': size,
-                'file_size_mb': file_size_mb,
-                'our_time': our_mean,
-                'our_std': our_std,
-                'xml_time': xml_mean,
-                'xml_std': xml_std,
-                'speedup': speedup
-            })
-            
-        finally:
-            os.unlink(xml_file)
+        # Read once so both parsers are timed on the same in-memory buffer, without file I/O
+        xml_bytes = Path(xml_file).read_bytes()
+        
+        # Benchmark our implementation
+        our_median, our_std = time_function(xml_to_dict_from_bytes, xml_bytes, num_runs=num_runs)
+        
+        # Benchmark xmltodict
+        xml_median, xml_std = time_function(xmltodict.parse, xml_bytes, num_runs=num_runs)
+        
+        # Calculate speedup
+        speedup = xml_median / our_median if our_median > 0 else float('inf')
+        
+        results.append({
+            'size': size,
+            'file_size_mb': file_size_mb,
+            'our_time': our_median,
+            'our_std': our_std,
+            'xml_time': xml_median,
+            'xml_std': xml_std,
+            'speedup': speedup
+        })
     
     # Print results table
     print()
     print("Benchmark Results:")
     print("-" * 80)
     print(f"{'Elements':<8} {'File Size':<10} {'xml_iterator':<15} {'xmltodict':<15} {'Speedup':<10}")
-    print(f"{'':8} {'(MB)':<10} {'(seconds)':<15} {'(seconds)':<15} {'(x)':<10}")
+    print(f"{'':8} {'(MB)':<10} {'(median s)':<15} {'(median s)':<15} {'(x)':<10}")
     print("-" * 80)
     
     for r in results:
@@ -125,38 +200,40 @@ def benchmark_xmltodict_compatibility():
     return results
 
 
-def benchmark_streaming_vs_dict():
+def benchmark_streaming_vs_dict(num_runs: int = 5):
     """Compare streaming iteration vs full dict conversion"""
     print("\n" + "=" * 60)
     print("Streaming vs Dictionary Conversion Benchmark")
     print("=" * 60)
     
-    size = 10000
-    xml_file = create_test_xml(size)
+    size = STREAMING_SIZE
+    xml_file = cached_test_xml(size)
     
-    try:
-        # Time streaming (early termination)
-        def stream_early_exit(filepath, max_events=1000):
-            from xml_iterator.xml_iterator import iter_xml
-            count = 0
-            for event_count, event, value in iter_xml(filepath):
-                count += 1
-                if count >= max_events:
-                    break
-            return count
-        
-        stream_time, _ = time_function(stream_early_exit, xml_file, 1000)
-        
-        # Time full dict conversion
-        dict_time, _ = time_function(xml_to_dict, xml_file)
-        
-        print(f"File size: {size} elements ({os.path.getsize(xml_file) / 1024:.1f} KB)")
-        print(f"Streaming (1000 events): {stream_time:.4f}s")
-        print(f"Full dict conversion:    {dict_time:.4f}s")
-        print(f"Streaming advantage:     {dict_time/stream_time:.1f}x faster for early termination")
-        
-    finally:
-        os.unlink(xml_file)
+    # Time streaming (early termination)
+    def stream_early_exit(filepath, max_events=1000):
+        from xml_iterator.xml_iterator import iter_xml
+        count = 0
+        for event_count, event, value in iter_xml(filepath):
+            count += 1
+            if count >= max_events:
+                break
+        return count
+    
+    stream_time, _ = time_function(stream_early_exit, xml_file, 1000, num_runs=num_runs)
+    
+    # Time full pass in Rust with no per-event Python objects
+    edge_time, _ = time_function(get_edge_counts, xml_file, num_runs=num_runs)
+    
+    # Time full dict conversion
+    dict_time, _ = time_function(xml_to_dict, xml_file, num_runs=num_runs)
+    
+    file_size_mb = os.path.getsize(xml_file) / 1024 / 1024
+    print(f"File size: {size} elements ({file_size_mb * 1024:.1f} KB)")
+    print(f"Streaming (1000 events): {stream_time:.4f}s")
+    print(f"Edge counts (full file): {edge_time:.4f}s ({file_size_mb / edge_time:.1f} MB/s)")
+    print(f"Full dict conversion:    {dict_time:.4f}s ({file_size_mb / dict_time:.1f} MB/s)")
+    print(f"Streaming advantage:     {dict_time/stream_time:.1f}x faster for early termination")
+    print(f"Dict materialization:    {dict_time/edge_time:.1f}x the cost of a dict-free full pass")
 
 
 def generate_readme_table():
@@ -166,26 +243,19 @@ def generate_readme_table():
     print("=" * 60)
     
     results = []
-    test_sizes = [500, 2000, 5000]
+    test_sizes = README_SIZES
+    prefetch_test_xml(test_sizes)
     
     for size in test_sizes:
-        xml_file = create_test_xml(size)
+        xml_file = cached_test_xml(size)
         file_size_mb = os.path.getsize(xml_file) / 1024 / 1024
         
-        try:
-            our_mean, _ = time_function(xml_to_dict, xml_file, num_runs=3)
-            
-            def xmltodict_parse(filepath):
-                with open(filepath, 'r') as f:
-                    return xmltodict.parse(f.read())
-            
-            xml_mean, _ = time_function(xmltodict_parse, xml_file, num_runs=3)
-            speedup = xml_mean / our_mean if our_mean > 0 else float('inf')
-            
-            results.append((size, file_size_mb, our_mean, xml_mean, speedup))
-            
-        finally:
-            os.unlink(xml_file)
+        our_median, _ = time_function(xml_to_dict, xml_file, num_runs=3)
+        
+        xml_median, _ = time_function(xmltodict_parse, xml_file, num_runs=3)
+        speedup = xml_median / our_median if our_median > 0 else float('inf')
+        
+        results.append((size, file_size_mb, our_median, xml_median, speedup))
     
     print("\nFor README.md:")
     print("```")
@@ -196,10 +266,35 @@ def generate_readme_table():
     print("```")
 
 
+def positive_int(text: str) -> int:
+    """argparse type for counts that must be >= 1"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return value
+
+
 if __name__ == "__main__":
     if not HAS_XMLTODICT:
         exit(1)
-        
-    benchmark_xmltodict_compatibility()
-    benchmark_streaming_vs_dict()
-    generate_readme_table()
\ No newline at end of file
+    
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quick', action='store_true',
+                        help=f'regression-gate mode: sizes {QUICK_SIZES}, 3 runs, no README table')
+    parser.add_argument('--sizes', type=positive_int, nargs='+', help='element counts to benchmark')
+    parser.add_argument('--runs', type=positive_int, help='measured runs per timing (default 5, 3 with --quick)')
+    args = parser.parse_args()
+    
+    sizes = args.sizes if args.sizes is not None else (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    runs = args.runs if args.runs is not None else (3 if args.quick else 5)
+    
+    prefetch_test_xml(sizes + [STREAMING_SIZE] + ([] if args.quick else README_SIZES))
+    isolate_benchmark_process()
+    
+    benchmark_xmltodict_compatibility(sizes, runs)
+    benchmark_streaming_vs_dict(runs)
+    if not args.quick:
+        generate_readme_table()
\ No newline at end of file
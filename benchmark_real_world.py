@@ -4,6 +4,8 @@ Real-world benchmark using large ESMA FIRDS XML file
 """
 
 import os
+import mmap
+import argparse
 import time
 import zipfile
 import tempfile
@@ -18,8 +20,8 @@ except ImportError:
     print("ERROR: xmltodict required for benchmarking - install with: pip install xmltodict")
     exit(1)
 
-from xml_iterator.xml_iterator import iter_xml
-from xml_iterator.core import xml_to_dict
+from xml_iterator.xml_iterator import count_elements, iter_xml, iter_xml_batch
+from xml_iterator.core import xml_to_dict, xml_to_dict_from_bytes
 
 
 # Configuration
@@ -29,6 +31,7 @@ from xml_iterator.core import xml_to_dict
 FIRDS_URL = "https://aiweb.cs.washington.edu/research/projects/xmltk/xmldata/data/SwissProt/SwissProt.xml"
 CACHE_DIR = Path("benchmark_data")
 ZIP_FILE = CACHE_DIR / os.path.basename(FIRDS_URL)
+DIRECT_IO_CHUNK_SIZE = 16 * 1024 * 1024  # multiple of the page size, as O_DIRECT requires
 
 
 def download_firds_data():
@@ -124,6 +127,38 @@ def extract_xml_from_zip(zip_path):
         raise e
 
 
+def load_xml_direct(xml_file, chunk_size=DIRECT_IO_CHUNK_SIZE):
+    """Read whole file with O_DIRECT into a page-aligned buffer, bypassing the page cache
+
+    Falls back to a plain buffered read where O_DIRECT is not available
+    (non-Linux, tmpfs, unaligned short reads, ...).
+    """
+    if not hasattr(os, 'O_DIRECT') or not hasattr(os, 'preadv'):
+        return memoryview(Path(xml_file).read_bytes())
+    
+    size = os.path.getsize(xml_file)
+    try:
+        fd = os.open(xml_file, os.O_RDONLY | os.O_DIRECT)
+    except OSError:
+        return memoryview(Path(xml_file).read_bytes())
+    
+    try:
+        # Anonymous mmap is page aligned; round capacity up to whole chunks
+        capacity = max(-(-size // chunk_size), 1) * chunk_size
+        view = memoryview(mmap.mmap(-1, capacity))
+        offset = 0
+        while offset < size:
+            n = os.preadv(fd, [view[offset:offset + chunk_size]], offset)
+            if n == 0:
+                break
+            offset += n
+        return view[:offset]
+    except OSError:
+        return memoryview(Path(xml_file).read_bytes())
+    finally:
+        os.close(fd)
+
+
 def benchmark_streaming_iteration(xml_file, max_events=10000):
     """Benchmark streaming iteration with early termination"""
     print(f"\nStreaming benchmark (first {max_events:,} events):")
@@ -131,10 +166,8 @@ def benchmark_streaming_iteration(xml_file, max_events=10000):
     start_time = time.perf_counter()
     count = 0
     
-    for event_count, event, value in iter_xml(xml_file):
-        count += 1
-        if count >= max_events:
-            break
+    for events, values in iter_xml_batch(xml_file, n_max=max_events):
+        count += len(events)
     
     end_time = time.perf_counter()
     duration = end_time - start_time
@@ -145,52 +178,70 @@ def benchmark_streaming_iteration(xml_file, max_events=10000):
     return duration, count
 
 
-def benchmark_xmltodict_full(xml_file):
-    """Benchmark xmltodict on full file"""
+def benchmark_xmltodict_full(xml_file, direct_io=False):
+    """Benchmark xmltodict on full file, SAX-streamed record by record
+
+    Constant memory, except with direct_io, where the whole file is loaded first.
+    """
     if not HAS_XMLTODICT:
         print("  Skipping xmltodict benchmark (not available)")
         return None, None
     
-    print(f"\nxmltodict full file benchmark:")
+    print(f"\nxmltodict full file benchmark{' (O_DIRECT read)' if direct_io else ''}:")
     
     try:
-        with open(xml_file, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-        
-        file_size_mb = len(xml_content.encode('utf-8')) / 1024 / 1024
+        file_size_mb = os.path.getsize(xml_file) / 1024 / 1024
         print(f"  File size: {file_size_mb:.1f} MB")
         
-        start_time = time.perf_counter()
-        result = xmltodict.parse(xml_content)
-        end_time = time.perf_counter()
+        item_count = 0
+        
+        def count_item(path, item):
+            nonlocal item_count
+            item_count += 1
+            return True  # keep parsing, but drop the item
+        
+        if direct_io:
+            # Cold read is part of the measurement, as in benchmark_xml_to_dict_full
+            start_time = time.perf_counter()
+            xmltodict.parse(load_xml_direct(xml_file), item_depth=2, item_callback=count_item)
+            end_time = time.perf_counter()
+        else:
+            with open(xml_file, 'rb') as f:
+                start_time = time.perf_counter()
+                xmltodict.parse(f, item_depth=2, item_callback=count_item)
+                end_time = time.perf_counter()
         
         duration = end_time - start_time
         
         print(f"  Parsed full file in {duration:.3f}s")
         print(f"  Rate: {file_size_mb/duration:.1f} MB/second")
-        print(f"  Result type: {type(result)}")
+        print(f"  Records streamed: {item_count:,}")
         
-        return duration, result
+        return duration, item_count
         
-    except MemoryError:
-        print(f"  ERROR: xmltodict ran out of memory")
-        return None, None
     except Exception as e:
         print(f"  ERROR: xmltodict failed - {e}")
         return None, None
 
 
-def benchmark_xml_to_dict_full(xml_file):
+def benchmark_xml_to_dict_full(xml_file, direct_io=False):
     """Benchmark our xml_to_dict on full file"""
-    print(f"\nxml_iterator xml_to_dict full file benchmark:")
+    print(f"\nxml_iterator xml_to_dict full file benchmark{' (O_DIRECT read)' if direct_io else ''}:")
     
     try:
         file_size_mb = os.path.getsize(xml_file) / 1024 / 1024
         print(f"  File size: {file_size_mb:.1f} MB")
         
-        start_time = time.perf_counter()
-        result = xml_to_dict(xml_file)  # No limits - full parsing
-        end_time = time.perf_counter()
+        if direct_io:
+            # Same cold read as the xmltodict side; the page cache is warm from the
+            # earlier streaming passes, so reading the path would not be comparable
+            start_time = time.perf_counter()
+            result = xml_to_dict_from_bytes(bytes(load_xml_direct(xml_file)))
+            end_time = time.perf_counter()
+        else:
+            start_time = time.perf_counter()
+            result = xml_to_dict(xml_file)  # No limits - full parsing
+            end_time = time.perf_counter()
         
         duration = end_time - start_time
         
@@ -199,14 +250,6 @@ def benchmark_xml_to_dict_full(xml_file):
         print(f"  Result type: {type(result)}")
         
         if isinstance(result, dict):
-            def count_elements(obj):
-                if isinstance(obj, dict):
-                    return 1 + sum(count_elements(v) for v in obj.values())
-                elif isinstance(obj, list):
-                    return sum(count_elements(item) for item in obj)
-                else:
-                    return 1
-            
             element_count = count_elements(result)
             print(f"  Dictionary elements: {element_count:,}")
             print(f"  Rate: {element_count/duration:,.0f} elements/second")
@@ -218,34 +261,35 @@ def benchmark_xml_to_dict_full(xml_file):
         return None, None
 
 
-def compare_results(our_result, xmltodict_result):
-    """Compare results and note any differences"""
+def count_records(result):
+    """Number of direct children of the root element (what xmltodict item_depth=2 streams)"""
+    if not isinstance(result, dict) or not result:
+        return 0
+    content = next(iter(result.values()))
+    if not isinstance(content, dict):
+        return 0
+    return sum(len(v) if isinstance(v, list) else 1 for k, v in content.items() if k != '#text')
+
+
+def compare_results(our_result, xmltodict_items):
+    """Compare record counts and note any differences"""
     print(f"\nResult comparison:")
     
-    if our_result is None and xmltodict_result is None:
+    if our_result is None and xmltodict_items is None:
         print("  Both failed - no comparison possible")
     elif our_result is None:
         print("  xml_iterator failed, xmltodict succeeded")
-    elif xmltodict_result is None:
+    elif xmltodict_items is None:
         print("  xmltodict failed, xml_iterator succeeded")
-    elif our_result == xmltodict_result:
-        print("  ✅ Results are identical")
     else:
-        print("  ⚠️  Results differ")
-        print(f"     xml_iterator type: {type(our_result)}")
-        print(f"     xmltodict type: {type(xmltodict_result)}")
-        
-        # Try to show some detail about differences
-        if isinstance(our_result, dict) and isinstance(xmltodict_result, dict):
-            our_keys = set(our_result.keys()) if our_result else set()
-            xml_keys = set(xmltodict_result.keys()) if xmltodict_result else set()
-            
-            if our_keys != xml_keys:
-                print(f"     Key differences: our_only={our_keys - xml_keys}, xml_only={xml_keys - our_keys}")
-            else:
-                print(f"     Same keys, different values")
-        
-        print("     (This is still a valid performance comparison)")
+        our_items = count_records(our_result)
+        if our_items == xmltodict_items:
+            print(f"  ✅ Same number of records: {our_items:,}")
+        else:
+            print("  ⚠️  Record counts differ")
+            print(f"     xml_iterator: {our_items:,}")
+            print(f"     xmltodict:    {xmltodict_items:,}")
+            print("     (This is still a valid performance comparison)")
 
 
 def benchmark_memory_efficiency(xml_file):
@@ -276,13 +320,15 @@ def benchmark_memory_efficiency(xml_file):
     print(f"  ✓ Demonstrates constant memory usage regardless of file size")
 
 
-def run_firds_benchmark():
+def run_firds_benchmark(direct_io=False, quick=False):
     """Run complete FIRDS benchmark suite"""
     print("Real-World XML Benchmark: ESMA FIRDS Data")
     print("=" * 50)
     
     try:
         # Download/cache the data
+        if quick and not ZIP_FILE.exists():
+            raise FileNotFoundError(f"--quick needs the cached file {ZIP_FILE}; run once without --quick first")
         zip_path = download_firds_data()
         
         # Extract XML file
@@ -297,11 +343,11 @@ def run_firds_benchmark():
         benchmark_memory_efficiency(xml_file)
         
         # Full file comparisons
-        our_duration, our_result = benchmark_xml_to_dict_full(xml_file)
-        xml_duration, xml_result = benchmark_xmltodict_full(xml_file)
+        our_duration, our_result = benchmark_xml_to_dict_full(xml_file, direct_io=direct_io)
+        xml_duration, xml_items = benchmark_xmltodict_full(xml_file, direct_io=direct_io)
         
         # Compare results
-        compare_results(our_result, xml_result)
+        compare_results(our_result, xml_items)
         
         # Performance summary
         if our_duration and xml_duration:
@@ -334,5 +380,13 @@ if __name__ == "__main__":
     if not HAS_XMLTODICT:
         exit(1)
     
-    success = run_firds_benchmark()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--direct-io', action='store_true',
+                        help='time a cold O_DIRECT load of the whole file (buffered fallback) for both '
+                             'full-file parsers; holds the entire file in memory, so xmltodict no longer streams')
+    parser.add_argument('--quick', action='store_true',
+                        help='never download: fail unless the data file is already cached')
+    args = parser.parse_args()
+    
+    success = run_firds_benchmark(direct_io=args.direct_io, quick=args.quick)
     exit(0 if success else 1)
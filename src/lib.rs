@@ -1,11 +1,11 @@
 use encoding_rs_io::DecodeReaderBytes;
 use pyo3::prelude::*;
-use pyo3::types::{PyTuple, PyDict};
+use pyo3::types::{PyTuple, PyDict, PyList};
 use quick_xml::{events::Event, Reader};
 use std::{
     error::Error,
     fs::File,
-    io::BufReader,
+    io::{BufRead, BufReader, Cursor},
     str,
     collections::{HashMap},
 };
@@ -14,7 +14,10 @@ const BUF_SIZE: usize = 4096; // 4kb at once
 #[pymodule]
 fn xml_iterator(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(iter_xml, m)?)?;
+    m.add_function(wrap_pyfunction!(iter_xml_batch, m)?)?;
+    m.add_function(wrap_pyfunction!(iter_xml_bytes, m)?)?;
     m.add_function(wrap_pyfunction!(get_edge_counts, m)?)?;
+    m.add_function(wrap_pyfunction!(count_elements, m)?)?;
     Ok(())
 }
 
@@ -30,6 +33,38 @@ fn iter_xml(path: &str) -> PyResult<PyObject> {
     })
 }
 
+// Same events as iter_xml but parsed from an in-memory bytes object (no file I/O).
+#[pyfunction]
+fn iter_xml_bytes(data: &[u8]) -> PyResult<PyObject> {
+    Python::with_gil(|py| -> PyResult<PyObject> {
+        let iterator = get_xml_bytes_iterator(data.to_vec());
+        let myiter = PyXMLIterator {
+            iter: Box::new(iterator),
+        };
+        Ok(myiter.into_py(py))
+    })
+}
+
+// Same events as iter_xml but handed over in chunks of (events, values) lists so the
+// Python side pays the per-item FFI/tuple cost once per batch instead of once per event.
+// n_max caps the total number of events (the last batch is short), like get_edge_counts.
+#[pyfunction(batch_size = "4096", n_max = "None")]
+fn iter_xml_batch(path: &str, batch_size: usize, n_max: Option<usize>) -> PyResult<PyObject> {
+    Python::with_gil(|py| -> PyResult<PyObject> {
+        let iterator = get_xml_iterator(path)
+            .map_err(|e| pyo3::exceptions::PyIOError::new_err(format!("Failed to open XML file: {}", e)))?;
+        let iter: Box<dyn Iterator<Item = ItemType> + Send> = match n_max {
+            Some(n) => Box::new(iterator.take(n)),
+            None => Box::new(iterator),
+        };
+        let myiter = PyXMLBatchIterator {
+            iter,
+            batch_size: batch_size.max(1),
+        };
+        Ok(myiter.into_py(py))
+    })
+}
+
 // this was some attempt to kind of do an xmltodict format thing ... but it is quite hard in rust.
 // is there any better to do this algorithmically to avoid some of the issues with rust?
 // Probably better to start with the count things routine which is simple ... just to get motivated about speed.
@@ -77,6 +112,36 @@ fn get_edge_counts(path: &str, n_max: Option<u32>) -> PyResult<PyObject> {
 }
 
 
+// Walk an xml_to_dict style result counting dicts and leaf values (lists are transparent).
+// Explicit stack rather than recursion so depth is only bounded by memory.
+// The stack holds owned PyObjects and each node is expanded inside its own GILPool, so
+// the &PyAny borrows made while iterating are released per node instead of piling up in
+// the call's pool until return (dict.values() would also allocate a list per dict).
+#[pyfunction]
+fn count_elements(py: Python, obj: &PyAny) -> PyResult<usize> {
+    let mut stack: Vec<PyObject> = vec![obj.into()];
+    let mut n: usize = 0;
+    while let Some(node) = stack.pop() {
+        let pool = unsafe { py.new_pool() };
+        let py = pool.python();
+        let o = node.as_ref(py);
+        if let Ok(d) = o.downcast::<PyDict>() {
+            n += 1;
+            for (_, v) in d.iter() {
+                stack.push(v.into());
+            }
+        } else if let Ok(l) = o.downcast::<PyList>() {
+            for v in l.iter() {
+                stack.push(v.into());
+            }
+        } else {
+            n += 1;
+        }
+    }
+    Ok(n)
+}
+
+
 // struct NestedThing {
 //     x: LinkedList<HashMap<String, NestedThing>>,
 // }
@@ -140,12 +205,44 @@ impl PyXMLIterator {
     }
 }
 
-struct XMLIterator {
-    reader: Reader<BufReader<DecodeReaderBytes<File, Vec<u8>>>>,
+#[pyclass]
+struct PyXMLBatchIterator {
+    iter: Box<dyn Iterator<Item = ItemType> + Send>,
+    batch_size: usize,
+}
+
+#[pymethods]
+impl PyXMLBatchIterator {
+    fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+    fn __next__(mut slf: PyRefMut<'_, Self>) -> Option<PyObject> {
+        let batch_size = slf.batch_size;
+        // batch_size is user supplied: don't pre-reserve more than BUF_SIZE, let the Vecs grow
+        let capacity = batch_size.min(BUF_SIZE);
+        let mut events: Vec<String> = Vec::with_capacity(capacity);
+        let mut values: Vec<String> = Vec::with_capacity(capacity);
+        for (_, event, value) in slf.iter.by_ref().take(batch_size) {
+            events.push(event);
+            values.push(value);
+        }
+        if events.is_empty() {
+            return None
+        }
+        Python::with_gil(|py| -> Option<PyObject> {
+            let events = PyList::new(py, events);
+            let values = PyList::new(py, values);
+            Some((events, values).into_py(py))
+        })
+    }
+}
+
+struct XMLIterator<R: BufRead> {
+    reader: Reader<R>,
     count: u32,
 }
 
-impl Iterator for XMLIterator {
+impl<R: BufRead> Iterator for XMLIterator<R> {
     type Item = (u32, String, String);
     fn next(&mut self) -> Option<Self::Item> {
         /* NOTE: this ingored attribute values see below if you need that */
@@ -183,7 +280,10 @@ impl Iterator for XMLIterator {
 }
 
 
-fn get_xml_iterator(path: &str) -> Result<XMLIterator, Box<dyn Error>> {
+type FileXMLIterator = XMLIterator<BufReader<DecodeReaderBytes<File, Vec<u8>>>>;
+type BytesXMLIterator = XMLIterator<BufReader<DecodeReaderBytes<Cursor<Vec<u8>>, Vec<u8>>>>;
+
+fn get_xml_iterator(path: &str) -> Result<FileXMLIterator, Box<dyn Error>> {
     println!("xml_iterator::reading {:?}", path);
     let fin = File::open(path)?;
     let bufreader = BufReader::new(DecodeReaderBytes::new(fin));
@@ -191,3 +291,9 @@ fn get_xml_iterator(path: &str) -> Result<XMLIterator, Box<dyn Error>> {
     let reader_iter = XMLIterator {reader: reader, count: 0};
     Ok(reader_iter)
 }
+
+fn get_xml_bytes_iterator(data: Vec<u8>) -> BytesXMLIterator {
+    let bufreader = BufReader::new(DecodeReaderBytes::new(Cursor::new(data)));
+    let reader = Reader::from_reader(bufreader);
+    XMLIterator {reader: reader, count: 0}
+}
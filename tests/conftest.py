@@ -0,0 +1,148 @@
+"""
+Shared pytest fixtures
+"""
+
+import os
+import shutil
+import tempfile
+from itertools import cycle
+
+import pytest
+
+
+# Memory-backed tmp dir (Linux) so perf thresholds measure the parser, not disk writeback
+MEMORY_TMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Filesystems whose files live in RAM, so there is no page cache to evict
+MEMORY_FS_TYPES = {'tmpfs', 'ramfs'}
+
+# Sizes (number of books) of the generated files handed out by xml_paths
+PERF_XML_SIZES = [1000, 1500, 2000, 5000]
+
+BOOK_TEMPLATE = '''  <book id="{0}">
+    <title>Book Title {0}</title>
+    <author>Author {1}</author>
+    <year>{2}</year>
+    <price>${3}.99</price>
+    <description>Description for book {0} with some text content.</description>
+  </book>
+'''
+
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+# -1 means no limit / indeterminate; write_all needs a positive chunk size
+IOV_MAX = IOV_MAX if IOV_MAX > 0 else 1024
+
+
+def write_all(fd, parts):
+    """Gather-write a list of bytes with os.writev, IOV_MAX buffers per syscall
+
+    Falls back to os.write of the joined buffer where writev is unavailable (Windows)
+    and finishes any short write the same way.
+    """
+    has_writev = hasattr(os, 'writev')
+    if not has_writev:
+        parts = [b''.join(parts)]
+    for start in range(0, len(parts), IOV_MAX):
+        chunk = parts[start:start + IOV_MAX]
+        written = os.writev(fd, chunk) if has_writev else 0
+        if written < sum(map(len, chunk)):
+            rest = memoryview(b''.join(chunk))[written:]
+            while rest:
+                rest = rest[os.write(fd, rest):]
+
+
+def create_large_xml(num_items, xml_dir):
+    """Create large XML file for testing as xml_dir/books_<num_items>.xml"""
+    # Columns (id, i % 100, 2000 + i % 24, 10 + i % 50) come from C-level iterators and
+    # map() drives the formatting, so there is no per-item Python frame or arithmetic
+    parts = [b'<?xml version="1.0" encoding="UTF-8"?>\n<catalog>\n']
+    parts.extend(map(str.encode, map(
+        BOOK_TEMPLATE.format,
+        range(num_items),
+        cycle(range(100)),
+        cycle(range(2000, 2024)),
+        cycle(range(10, 60)),
+    )))
+    parts.append(b'</catalog>\n')
+    path = os.path.join(str(xml_dir), f'books_{num_items}.xml')
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        write_all(fd, parts)
+    finally:
+        os.close(fd)
+    return path
+
+
+def drop_page_cache(path):
+    """Ask the kernel to evict path from the page cache (no-op without posix_fadvise)"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)  # dirty pages are not dropped
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def is_memory_backed(path):
+    """True if path is on tmpfs/ramfs (same device as /dev/shm, or per /proc/mounts on Linux)"""
+    path = os.path.realpath(path)
+    if MEMORY_TMP_DIR and os.stat(path).st_dev == os.stat(MEMORY_TMP_DIR).st_dev:
+        return True
+    try:
+        with open('/proc/mounts') as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    # Longest matching mount point wins; later entries shadow earlier ones at the same point
+    best, fstype = '', None
+    for mount_point, fs in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) >= len(best):
+            best, fstype = mount_point, fs
+    return fstype in MEMORY_FS_TYPES
+
+
+@pytest.fixture(scope="session")
+def xml_paths(tmp_path_factory):
+    """{num_items: path} for every PERF_XML_SIZES entry, generated once per session
+
+    Files live in a session tmpdir (on /dev/shm when available) that is removed
+    at the end of the session, so tests must not delete them.
+    """
+    if MEMORY_TMP_DIR:
+        xml_dir = tempfile.mkdtemp(prefix='xml_iterator_', dir=MEMORY_TMP_DIR)
+    else:
+        xml_dir = str(tmp_path_factory.mktemp("xml"))
+    
+    paths = {num_items: create_large_xml(num_items, xml_dir) for num_items in PERF_XML_SIZES}
+    
+    yield paths
+    
+    if MEMORY_TMP_DIR:
+        shutil.rmtree(xml_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def cold_xml_factory(tmp_path):
+    """Return make(num_items) -> path of a fresh on-disk file evicted from the page cache
+
+    Skips the test when that cannot be arranged: no posix_fadvise, or pytest's
+    tmp_path is memory backed (e.g. /tmp on tmpfs), where the read is always warm.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        pytest.skip("posix_fadvise unavailable, cannot evict files from the page cache")
+    if is_memory_backed(tmp_path):
+        pytest.skip(f"{tmp_path} is memory backed, a cold read is not possible")
+    
+    def make(num_items):
+        path = create_large_xml(num_items, tmp_path)
+        drop_page_cache(path)
+        return path
+    
+    return make
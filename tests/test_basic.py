@@ -3,31 +3,30 @@
 Basic functionality tests for xml_iterator
 """
 
-import os
-import tempfile
+from collections import Counter, OrderedDict
+from uuid import uuid4
 import xml.etree.ElementTree as ET
 import pytest
 
+from xml_iterator.core import count_elements as py_count_elements
 from xml_iterator.core import get_edge_counts as py_get_edge_counts
-from xml_iterator.xml_iterator import get_edge_counts, iter_xml
+from xml_iterator.core import xml_to_dict
+from xml_iterator.xml_iterator import count_elements, get_edge_counts, iter_xml, iter_xml_batch
 
 
-def create_test_xml(content):
-    """Create temporary XML file for testing"""
-    fd, path = tempfile.mkstemp(suffix='.xml')
-    try:
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return path
-    except:
-        os.close(fd)
-        raise
+def create_test_xml(tmp_path, content):
+    """Write XML into a uniquely named file under pytest's tmp_path (str as UTF-8, bytes as-is)"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    path = tmp_path / f"{uuid4().hex}.xml"
+    path.write_bytes(content)
+    return str(path)
 
 
 class TestBasicParsing:
     """Test basic XML parsing functionality"""
     
-    def test_simple_structure(self):
+    def test_simple_structure(self, tmp_path):
         """Test basic XML structure parsing against ElementTree"""
         xml_content = """<?xml version="1.0"?>
 <root>
@@ -41,33 +40,18 @@ class TestBasicParsing:
     </item>
 </root>"""
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Parse with ElementTree for comparison
-            et_elements = []
-            for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
-                if event == 'start':
-                    et_elements.append(('start', elem.tag))
-                elif event == 'end':
-                    et_elements.append(('end', elem.tag))
-                    if elem.text and elem.text.strip():
-                        et_elements.append(('text', elem.text.strip()))
-            
-            # Parse with our iterator
-            our_elements = []
-            for count, event, value in iter_xml(xml_file):
-                our_elements.append((event, value))
-            
-            # Basic structure should match
-            our_tags = [(e, v) for e, v in our_elements if e in ('start', 'end')]
-            et_tags = [(e, v) for e, v in et_elements if e in ('start', 'end')]
-            
-            assert len(our_tags) == len(et_tags), f"Tag count mismatch: {len(our_tags)} vs {len(et_tags)}"
-            
-        finally:
-            os.unlink(xml_file)
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        # Parse with ElementTree for comparison
+        et_tags = [(event, elem.tag) for event, elem in ET.iterparse(xml_file, events=('start', 'end'))]
+        
+        # Parse with our iterator
+        our_tags = [(e, v) for _, e, v in iter_xml(xml_file) if e in ('start', 'end')]
+        
+        # Basic structure should match
+        assert len(our_tags) == len(et_tags), f"Tag count mismatch: {len(our_tags)} vs {len(et_tags)}"
 
-    def test_edge_counts_consistency(self):
+    def test_edge_counts_consistency(self, tmp_path):
         """Test that Rust and Python edge counting implementations match"""
         xml_content = """<?xml version="1.0"?>
 <catalog>
@@ -87,108 +71,148 @@ class TestBasicParsing:
     </book>
 </catalog>"""
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Test Rust implementation
-            rust_counts = get_edge_counts(xml_file)
-            
-            # Test Python implementation
-            py_counts = py_get_edge_counts(xml_file)
-            
-            # Should have same keys and values
-            assert rust_counts == py_counts, "Rust and Python edge counts don't match"
-            
-            # Verify expected structure
-            expected_paths = [
-                ('catalog',),
-                ('catalog', 'book'),
-                ('catalog', 'book', 'title'),
-                ('catalog', 'book', 'author'),
-            ]
-            
-            for path in expected_paths:
-                assert path in rust_counts, f"Missing expected path: {path}"
-            
-        finally:
-            os.unlink(xml_file)
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        # Test Rust implementation
+        rust_counts = get_edge_counts(xml_file)
+        
+        # Test Python implementation
+        py_counts = py_get_edge_counts(xml_file)
+        
+        # Should have same keys and values
+        assert rust_counts == py_counts, "Rust and Python edge counts don't match"
+        
+        # Verify expected structure
+        expected_paths = [
+            ('catalog',),
+            ('catalog', 'book'),
+            ('catalog', 'book', 'title'),
+            ('catalog', 'book', 'author'),
+        ]
+        
+        for path in expected_paths:
+            assert path in rust_counts, f"Missing expected path: {path}"
+
+    def test_count_elements_consistency(self, tmp_path):
+        """Test that Rust and Python element counting implementations match"""
+        xml_content = """<?xml version="1.0"?>
+<catalog>
+    <book>
+        <title>XML Guide</title>
+        <author>John Doe</author>
+        <note/>
+    </book>
+    <book>
+        <title>Advanced XML</title>
+        <author>Jane Smith</author>
+    </book>
+</catalog>"""
+        
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        result = xml_to_dict(xml_file)
+        
+        assert count_elements(result) == py_count_elements(result)
+        # catalog + book list of 2 dicts with 2-3 leaves each
+        assert py_count_elements(result) == 9
+        assert count_elements('leaf') == 1
+        assert count_elements([]) == 0
+        # dict/list subclasses (older xmltodict returns OrderedDict) count like the builtins
+        ordered = OrderedDict(catalog=OrderedDict(book=[OrderedDict(title='a'), 'b']))
+        assert count_elements(ordered) == py_count_elements(ordered) == 5
 
-    def test_streaming_behavior(self):
+    def test_streaming_behavior(self, tmp_path):
         """Test that iteration works with early termination"""
         # Create XML with many repeated elements
-        xml_content = '<?xml version="1.0"?><root>'
-        for i in range(10000):
-            xml_content += f'<item>{i}</item>'
-        xml_content += '</root>'
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Test early termination
-            count = 0
-            for event_count, event, value in iter_xml(xml_file):
-                count += 1
-                if count > 100:  # Stop early
-                    break
-            
-            assert count == 101, f"Expected 101 events, got {count}"
-            
-        finally:
-            os.unlink(xml_file)
+        parts = ['<?xml version="1.0"?><root>']
+        parts.extend(f'<item>{i}</item>' for i in range(10000))
+        parts.append('</root>')
+        xml_content = ''.join(parts)
+        
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        # Test early termination
+        count = 0
+        for event_count, event, value in iter_xml(xml_file):
+            count += 1
+            if count > 100:  # Stop early
+                break
+        
+        assert count == 101, f"Expected 101 events, got {count}"
 
-    def test_encoding_handling(self):
+    def test_batch_iteration(self, tmp_path):
+        """Test that batched iteration yields the same events as iter_xml"""
+        parts = ['<?xml version="1.0"?><root>']
+        parts.extend(f'<item>{i}</item>' for i in range(10000))
+        parts.append('</root>')
+        xml_content = ''.join(parts)
+        
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        expected = [(event, value) for count, event, value in iter_xml(xml_file)]
+        
+        count = 0
+        batched = []
+        for batch in iter_xml_batch(xml_file, batch_size=4096):
+            events, values = batch
+            assert len(events) == len(values)
+            assert 0 < len(events) <= 4096
+            count += len(batch[0])
+            batched.extend(zip(events, values))
+        
+        assert count == len(expected), f"Expected {len(expected)} events, got {count}"
+        assert batched == expected, "Batched events differ from iter_xml"
+        
+        # n_max caps the total, so the last batch is short rather than overshooting
+        n_max = len(expected) - 1
+        limited = list(iter_xml_batch(xml_file, batch_size=4, n_max=n_max))
+        assert [len(events) for events, _ in limited] == [4] * (n_max // 4) + ([n_max % 4] if n_max % 4 else [])
+        assert [pair for events, values in limited for pair in zip(events, values)] == expected[:n_max]
+
+    def test_encoding_handling(self, tmp_path):
         """Test various text encodings"""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <root>
     <text>Hello 世界 🌍</text>
     <french>Café François</french>
     <math>∑ ∞ α β γ</math>
-</root>"""
+</root>""".encode('utf-8')
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            text_values = []
-            for count, event, value in iter_xml(xml_file):
-                if event == 'text':
-                    text_values.append(value)
-            
-            # Should preserve Unicode correctly
-            assert any('世界' in text for text in text_values), "Unicode text not preserved"
-            assert any('🌍' in text for text in text_values), "Emoji not preserved"
-            assert any('Café' in text for text in text_values), "Accented characters not preserved"
-            
-        finally:
-            os.unlink(xml_file)
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        text_values = []
+        for count, event, value in iter_xml(xml_file):
+            if event == 'text':
+                text_values.append(value)
+        
+        # Should preserve Unicode correctly
+        assert any('世界' in text for text in text_values), "Unicode text not preserved"
+        assert any('🌍' in text for text in text_values), "Emoji not preserved"
+        assert any('Café' in text for text in text_values), "Accented characters not preserved"
 
-    def test_deep_nesting(self):
+    def test_deep_nesting(self, tmp_path):
         """Test behavior with deeply nested XML"""
         depth = 1000
-        xml_content = '<?xml version="1.0"?>'
         
         # Create deeply nested structure
-        for i in range(depth):
-            xml_content += f'<level{i}>'
-        xml_content += '<content>deep</content>'
-        for i in range(depth - 1, -1, -1):
-            xml_content += f'</level{i}>'
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            start_count = 0
-            end_count = 0
-            
-            for count, event, value in iter_xml(xml_file):
-                if event == 'start':
-                    start_count += 1
-                elif event == 'end':
-                    end_count += 1
-            
-            # Should handle deep nesting without issues
-            assert start_count == depth + 1, f"Expected {depth + 1} start events, got {start_count}"
-            assert end_count == depth + 1, f"Expected {depth + 1} end events, got {end_count}"
-            
-        finally:
-            os.unlink(xml_file)
+        xml_content = (
+            '<?xml version="1.0"?>'
+            + ''.join(f'<level{i}>' for i in range(depth))
+            + '<content>deep</content>'
+            + ''.join(f'</level{i}>' for i in range(depth - 1, -1, -1))
+        )
+        
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        event_counts = Counter(event for _, event, _ in iter_xml(xml_file))
+        start_count = event_counts['start']
+        end_count = event_counts['end']
+        
+        # Should handle deep nesting without issues
+        assert start_count == depth + 1, f"Expected {depth + 1} start events, got {start_count}"
+        assert end_count == depth + 1, f"Expected {depth + 1} end events, got {end_count}"
 
-    def test_n_max_parameter(self):
+    def test_n_max_parameter(self, tmp_path):
         """Test n_max limiting in get_edge_counts"""
         xml_content = (
             """<?xml version="1.0"?>
@@ -197,26 +221,23 @@ class TestBasicParsing:
             + '</root>'
         )
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Test with limit
-            limited_counts = get_edge_counts(xml_file, n_max=50)
-            unlimited_counts = get_edge_counts(xml_file)
-            
-            # Limited should have fewer entries
-            limited_total = sum(limited_counts.values())
-            unlimited_total = sum(unlimited_counts.values())
-            
-            assert limited_total < unlimited_total, "n_max parameter not working"
-            
-        finally:
-            os.unlink(xml_file)
+        xml_file = create_test_xml(tmp_path, xml_content)
+        
+        # Test with limit
+        limited_counts = get_edge_counts(xml_file, n_max=50)
+        unlimited_counts = get_edge_counts(xml_file)
+        
+        # Limited should have fewer entries
+        limited_total = sum(limited_counts.values())
+        unlimited_total = sum(unlimited_counts.values())
+        
+        assert limited_total < unlimited_total, "n_max parameter not working"
 
 
 class TestMalformedXML:
     """Test behavior with malformed XML"""
     
-    def test_malformed_xml_handling(self):
+    def test_malformed_xml_handling(self, tmp_path):
         """Test behavior with various malformed XML cases"""
         malformed_cases = [
             ('<?xml version="1.0"?><root><unclosed>', 'Unclosed tag'),
@@ -225,7 +246,7 @@ class TestMalformedXML:
         ]
         
         for xml_content, description in malformed_cases:
-            xml_file = create_test_xml(xml_content)
+            xml_file = create_test_xml(tmp_path, xml_content)
             try:
                 # Should not crash, may return partial results
                 events = list(iter_xml(xml_file))
@@ -233,6 +254,4 @@ class TestMalformedXML:
                 assert isinstance(events, list)
             except Exception:
                 # Graceful handling of errors is also acceptable
-                pass
-            finally:
-                os.unlink(xml_file)
\ No newline at end of file
+                pass
\ No newline at end of file
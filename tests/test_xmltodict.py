@@ -4,11 +4,10 @@ xmltodict compatibility tests with strict exact comparisons
 """
 
 import json
-import os
-import tempfile
+from uuid import uuid4
 import pytest
 
-from xml_iterator.core import xml_to_dict
+from xml_iterator.core import xml_to_dict, xml_to_dict_from_bytes
 
 # Import xmltodict for comparison
 try:
@@ -19,53 +18,22 @@ except ImportError:
     pytestmark = pytest.mark.skip(reason="xmltodict library not available")
 
 
-def create_test_xml(content):
-    """Create temporary XML file for testing"""
-    fd, path = tempfile.mkstemp(suffix='.xml')
-    try:
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return path
-    except:
-        os.close(fd)
-        raise
+def create_test_xml(tmp_path, content):
+    """Write content as UTF-8 into a uniquely named file under pytest's tmp_path"""
+    path = tmp_path / f"{uuid4().hex}.xml"
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
 
 
-@pytest.mark.skipif(not HAS_XMLTODICT, reason="xmltodict library not available")
-class TestXMLtoDictCompatibility:
-    """Test exact compatibility with xmltodict library"""
-    
-    def test_simple_structure_exact(self):
-        """Test basic XML structure with EXACT comparison"""
-        xml_content = """<?xml version="1.0"?>
+# Documents checked for EXACT equality with xmltodict.parse
+CASES = {
+    'simple_structure': """<?xml version="1.0"?>
 <person>
     <name>John Doe</name>
     <age>30</age>
     <city>New York</city>
-</person>"""
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Our implementation
-            our_result = xml_to_dict(xml_file)
-            
-            # xmltodict comparison
-            with open(xml_file, 'r') as f:
-                xmltodict_result = xmltodict.parse(f.read())
-            
-            # EXACT comparison
-            assert our_result == xmltodict_result, (
-                f"Results don't match!\n"
-                f"Ours: {json.dumps(our_result, indent=2)}\n"
-                f"xmltodict: {json.dumps(xmltodict_result, indent=2)}"
-            )
-            
-        finally:
-            os.unlink(xml_file)
-
-    def test_repeated_elements_exact(self):
-        """Test XML with repeated elements - EXACT comparison"""
-        xml_content = """<?xml version="1.0"?>
+</person>""",
+    'repeated_elements': """<?xml version="1.0"?>
 <catalog>
     <book>
         <title>Book 1</title>
@@ -75,73 +43,16 @@ class TestXMLtoDictCompatibility:
         <title>Book 2</title>
         <author>Author 2</author>
     </book>
-</catalog>"""
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            our_result = xml_to_dict(xml_file)
-            
-            with open(xml_file, 'r') as f:
-                xmltodict_result = xmltodict.parse(f.read())
-            
-            # EXACT comparison
-            assert our_result == xmltodict_result, (
-                f"Results don't match!\n"
-                f"Ours: {json.dumps(our_result, indent=2)}\n"
-                f"xmltodict: {json.dumps(xmltodict_result, indent=2)}"
-            )
-            
-        finally:
-            os.unlink(xml_file)
-
-    def test_text_only_element_exact(self):
-        """Test simple text-only elements - EXACT comparison"""
-        xml_content = """<?xml version="1.0"?>
-<message>Hello World</message>"""
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            our_result = xml_to_dict(xml_file)
-            
-            with open(xml_file, 'r') as f:
-                xmltodict_result = xmltodict.parse(f.read())
-            
-            assert our_result == xmltodict_result, (
-                f"Results don't match!\n"
-                f"Ours: {json.dumps(our_result, indent=2)}\n"
-                f"xmltodict: {json.dumps(xmltodict_result, indent=2)}"
-            )
-            
-        finally:
-            os.unlink(xml_file)
-
-    def test_empty_elements_exact(self):
-        """Test empty elements including self-closing tags - EXACT comparison"""
-        xml_content = """<?xml version="1.0"?>
+</catalog>""",
+    'text_only_element': """<?xml version="1.0"?>
+<message>Hello World</message>""",
+    # includes self-closing tags
+    'empty_elements': """<?xml version="1.0"?>
 <root>
     <empty></empty>
     <also_empty/>
-</root>"""
-        
-        xml_file = create_test_xml(xml_content)
-        try:
-            our_result = xml_to_dict(xml_file)
-            
-            with open(xml_file, 'r') as f:
-                xmltodict_result = xmltodict.parse(f.read())
-            
-            assert our_result == xmltodict_result, (
-                f"Results don't match!\n"
-                f"Ours: {json.dumps(our_result, indent=2)}\n"
-                f"xmltodict: {json.dumps(xmltodict_result, indent=2)}"
-            )
-            
-        finally:
-            os.unlink(xml_file)
-
-    def test_breakfast_menu_exact(self):
-        """Test breakfast menu example - EXACT comparison"""
-        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
+</root>""",
+    'breakfast_menu': """<?xml version="1.0" encoding="UTF-8"?>
 <breakfast_menu>
   <food>
     <name>Belgian Waffles</name>
@@ -155,50 +66,71 @@ class TestXMLtoDictCompatibility:
     <description>Light Belgian waffles covered with strawberries and whipped cream</description>
     <calories>900</calories>
   </food>
-</breakfast_menu>"""
+</breakfast_menu>""",
+    'unicode_catalog': """<?xml version="1.0" encoding="UTF-8"?>
+<catalog>
+    <book>
+        <title>Café 世界</title>
+        <author>Author 1</author>
+    </book>
+    <book>
+        <title>Book 2</title>
+        <empty/>
+    </book>
+</catalog>""",
+}
+
+# Deeply nested document for the protection limit tests
+DEEP_XML_DEPTH = 50
+DEEP_XML = (
+    '<?xml version="1.0"?>'
+    + ''.join(f'<level{i}>' for i in range(DEEP_XML_DEPTH))
+    + '<content>deep value</content>'
+    + ''.join(f'</level{i}>' for i in range(DEEP_XML_DEPTH - 1, -1, -1))
+)
+
+# xmltodict results, parsed once at import from the in-memory strings
+REFERENCE = {name: xmltodict.parse(content) for name, content in CASES.items()} if HAS_XMLTODICT else {}
+
+
+@pytest.mark.skipif(not HAS_XMLTODICT, reason="xmltodict library not available")
+class TestXMLtoDictCompatibility:
+    """Test exact compatibility with xmltodict library"""
+    
+    @pytest.mark.parametrize("source", ["bytes", "file"])
+    @pytest.mark.parametrize("name", list(CASES))
+    def test_exact(self, name, source, tmp_path):
+        """Test each CASES document against xmltodict with EXACT comparison
+
+        Both readers are checked: in-memory bytes and the public xml_to_dict(path).
+        """
+        if source == "bytes":
+            our_result = xml_to_dict_from_bytes(CASES[name].encode('utf-8'))
+        else:
+            our_result = xml_to_dict(create_test_xml(tmp_path, CASES[name]))
+        xmltodict_result = REFERENCE[name]
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            our_result = xml_to_dict(xml_file)
-            
-            with open(xml_file, 'r') as f:
-                xmltodict_result = xmltodict.parse(f.read())
-            
-            assert our_result == xmltodict_result, (
-                f"Results don't match!\n"
-                f"Our result keys: {list(our_result.keys()) if isinstance(our_result, dict) else type(our_result)}\n"
-                f"xmltodict keys: {list(xmltodict_result.keys()) if isinstance(xmltodict_result, dict) else type(xmltodict_result)}"
-            )
-            
-        finally:
-            os.unlink(xml_file)
+        # EXACT comparison
+        assert our_result == xmltodict_result, (
+            f"Results don't match!\n"
+            f"Ours: {json.dumps(our_result, indent=2)}\n"
+            f"xmltodict: {json.dumps(xmltodict_result, indent=2)}"
+        )
 
-    def test_protection_limits(self):
+    def test_protection_limits(self, tmp_path):
         """Test max_depth and max_events protection parameters"""
-        # Create deeply nested XML
-        xml_content = '<?xml version="1.0"?>'
-        depth = 50
-        for i in range(depth):
-            xml_content += f'<level{i}>'
-        xml_content += '<content>deep value</content>'
-        for i in range(depth - 1, -1, -1):
-            xml_content += f'</level{i}>'
+        xml_file = create_test_xml(tmp_path, DEEP_XML)
+        
+        # Test with depth limit
+        limited_result = xml_to_dict(xml_file, max_depth=10)
+        
+        # Test with event limit
+        event_limited = xml_to_dict(xml_file, max_events=50)
+        
+        # Full parse
+        full_result = xml_to_dict(xml_file)
         
-        xml_file = create_test_xml(xml_content)
-        try:
-            # Test with depth limit
-            limited_result = xml_to_dict(xml_file, max_depth=10)
-            
-            # Test with event limit
-            event_limited = xml_to_dict(xml_file, max_events=50)
-            
-            # Full parse
-            full_result = xml_to_dict(xml_file)
-            
-            # Verify limits work
-            assert limited_result != full_result or event_limited != full_result, (
-                "Protection limits should affect parsing results"
-            )
-            
-        finally:
-            os.unlink(xml_file)
\ No newline at end of file
+        # Verify limits work
+        assert limited_result != full_result or event_limited != full_result, (
+            "Protection limits should affect parsing results"
+        )
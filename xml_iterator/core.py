@@ -1,5 +1,5 @@
 from collections import defaultdict
-from xml_iterator.xml_iterator import iter_xml
+from xml_iterator.xml_iterator import iter_xml, iter_xml_bytes
 
 def get_edge_counts(filename, n_max=None):
     """
@@ -26,6 +26,28 @@ def get_edge_counts(filename, n_max=None):
     return dict(counter)
 
 
+def count_elements(root):
+    """
+    Count dict nodes and leaf values in an xml_to_dict result (lists are transparent).
+
+    Iterative so deeply nested documents cannot hit the recursion limit. The Rust
+    version in xml_iterator.xml_iterator is the fast one.
+    """
+    stack = [root]
+    n = 0
+    while stack:
+        obj = stack.pop()
+        # isinstance, like the Rust downcast, so dict/list subclasses (OrderedDict) count the same
+        if isinstance(obj, dict):
+            n += 1
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+        else:
+            n += 1
+    return n
+
+
 def read_records(filename, n_max=None):
     # NOTE: this is probably what to use
     iter_in = iter_xml(filename)
@@ -87,11 +109,33 @@ def xml_to_dict(filename, max_depth=None, max_events=None):
     Returns:
         Dictionary representation of XML
     """
+    return _events_to_dict(iter_xml(filename), max_depth=max_depth, max_events=max_events)
+
+
+def xml_to_dict_from_bytes(data, max_depth=None, max_events=None):
+    """
+    Same as xml_to_dict but parses an in-memory bytes object instead of a file.
+    
+    Args:
+        data: XML document as bytes
+        max_depth: Optional maximum nesting depth (for protection)
+        max_events: Optional maximum number of events to process
+    
+    Returns:
+        Dictionary representation of XML
+    """
+    return _events_to_dict(iter_xml_bytes(data), max_depth=max_depth, max_events=max_events)
+
+
+def _events_to_dict(events, max_depth=None, max_events=None):
+    """
+    Build the xmltodict style dictionary from an iter_xml event stream.
+    """
     stack = []
     root = None
     event_count = 0
     
-    for count, event, value in iter_xml(filename):
+    for count, event, value in events:
         event_count += 1
         
         # Optional limits for protection